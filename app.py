@@ -1,17 +1,20 @@
 import streamlit as st
 import fitz
 import re
+import asyncio
+import hashlib
+import xxhash
 from dotenv import load_dotenv
 import os
+import shutil
+import tempfile
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain.chat_models import ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.prompts import PromptTemplate
-from langchain.schema import Document
-from langchain.chains import RetrievalQA
+# LangChain, FAISS and NumPy are imported inside the functions that use them,
+# so the landing page renders without paying their import cost
 
 try:
     os.environ["OPENAI_API_KEY"] = st.secrets["OPENAI_API_KEY"]
@@ -22,48 +25,204 @@ except:
 # ======================================================
 # ---------------  TEXT CLEANING -----------------------
 # ======================================================
+_CLEAN_RE = re.compile(r"[^\w\s.,;:!?()-]")
+_WORD_RE = re.compile(r"\S+")
+# ASCII deletion table derived from the same pattern, for the translate fast path
+_ASCII_DELETE_TABLE = {i: None for i in range(128) if _CLEAN_RE.match(chr(i))}
+
 def clean_text(raw_text):
-    return re.sub(r"[^\w\s.,;:!?()-]", "", raw_text)
+    if raw_text.isascii():
+        return raw_text.translate(_ASCII_DELETE_TABLE)
+    return _CLEAN_RE.sub("", raw_text)
 
 # ======================================================
 # ---------------  PDF EXTRACTION ----------------------
 # ======================================================
-def extract_text(pdf_file):
-    pdf_doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
-    text = ""
+@st.cache_data(show_spinner=False, max_entries=16)
+def extract_text_and_info(pdf_hash, _pdf_bytes):
+    """Extract cleaned per-page text and PDF metadata in a single pass"""
+    pdf_doc = fitz.open(stream=_pdf_bytes, filetype="pdf")
+    pages = []
     for page in pdf_doc:
-        text += page.get_text("text")
-    pdf_doc.close()
-    return clean_text(text)
-
-def get_pdf_info(pdf_file):
-    """Extract PDF metadata"""
-    pdf_doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
+        # Page text is read block by block, keeping only text blocks (type 0)
+        blocks = page.get_text("blocks")
+        pages.append(clean_text("\n".join(b[4] for b in blocks if b[6] == 0)))
     info = {
-        "pages": len(pdf_doc),
+        "pages": pdf_doc.page_count,
         "title": pdf_doc.metadata.get("title", "Unknown"),
     }
     pdf_doc.close()
-    return info
+    return pages, info
 
 # ======================================================
 # ---------------  FAISS VECTOR DB ---------------------
 # ======================================================
-def create_faiss_db(text):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = splitter.split_text(text)
-    docs = [Document(page_content=c) for c in chunks]
-
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-    db = FAISS.from_documents(docs, embeddings)
+EMBED_BATCH_SIZE = 256
+EMBED_MAX_CONCURRENCY = 4
+
+async def embed_chunks(embeddings, chunks):
+    """Embed chunks with up to EMBED_MAX_CONCURRENCY batches in flight at once"""
+    # Unbounded fan-out on a large PDF trips OpenAI's rate limits and fails the ingest
+    semaphore = asyncio.Semaphore(EMBED_MAX_CONCURRENCY)
+
+    async def embed_batch(batch):
+        async with semaphore:
+            return await embeddings.aembed_documents(batch)
+
+    batches = [chunks[i:i + EMBED_BATCH_SIZE] for i in range(0, len(chunks), EMBED_BATCH_SIZE)]
+    results = await asyncio.gather(*(embed_batch(b) for b in batches))
+    return [vec for batch in results for vec in batch]
+
+FAISS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+# Bump whenever chunking or index construction changes, so old entries aren't served
+FAISS_CACHE_VERSION = 1
+FAISS_CACHE_TTL = 7 * 24 * 60 * 60
+EMBED_DIM = 1536  # text-embedding-3-small
+HNSW_MIN_CHUNKS = 2000
+SQ_TRAIN_SIZE = 10000
+
+@st.cache_resource(show_spinner=False)
+def get_http_client():
+    """Shared HTTP/2 client so follow-up API calls reuse the open TLS connection"""
+    import httpx
+    return httpx.Client(http2=True, limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=300.0))
+
+def get_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+    # Only the sync client is shared: each asyncio.run in create_faiss_db runs on
+    # a fresh event loop, which an async client can't be carried across
+    return OpenAIEmbeddings(model="text-embedding-3-small", chunk_size=EMBED_BATCH_SIZE, http_client=get_http_client())
+
+def create_faiss_db(pages):
+    import faiss
+    import numpy as np
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores.utils import DistanceStrategy
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    # Size chunks in tokens so embedding requests pack close to the model limit
+    splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name="cl100k_base", chunk_size=400, chunk_overlap=50
+    )
+    # Split page by page, so chunks never straddle a page boundary
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        chunks = list(chain.from_iterable(pool.map(splitter.split_text, pages)))
+
+    embeddings = get_embeddings()
+    vectors = asyncio.run(embed_chunks(embeddings, chunks))
+    # int8 scalar quantization keeps a quarter of the FP32 footprint on both paths
+    train_vectors = np.array(vectors[:SQ_TRAIN_SIZE], dtype="float32")
+    if len(chunks) > HNSW_MIN_CHUNKS:
+        # Large documents get a graph index so queries don't scan every vector;
+        # the OpenAI embeddings are unit length, so L2 ranks the same as cosine
+        index = faiss.IndexHNSWSQ(EMBED_DIM, faiss.ScalarQuantizer.QT_8bit, 32)
+        index.hnsw.efConstruction = 80
+        index.hnsw.efSearch = 64
+        index.train(train_vectors)
+        db = FAISS(embedding_function=embeddings, index=index, docstore=InMemoryDocstore(), index_to_docstore_id={})
+        db.add_embeddings(list(zip(chunks, vectors)))
+    else:
+        # Unit-length embeddings also make inner product rank as cosine
+        index = faiss.IndexScalarQuantizer(EMBED_DIM, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(train_vectors)
+        db = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        )
+        db.add_embeddings(list(zip(chunks, vectors)))
     return db, len(chunks)
 
+def faiss_cache_path(pdf_hash):
+    return os.path.join(FAISS_CACHE_DIR, f"v{FAISS_CACHE_VERSION}-{pdf_hash}")
+
+def prune_faiss_cache():
+    """Delete on-disk indexes that haven't been used for FAISS_CACHE_TTL seconds"""
+    if not os.path.isdir(FAISS_CACHE_DIR):
+        return
+    cutoff = time.time() - FAISS_CACHE_TTL
+    for name in os.listdir(FAISS_CACHE_DIR):
+        path = os.path.join(FAISS_CACHE_DIR, name)
+        try:
+            expired = os.path.getmtime(path) < cutoff
+        except OSError:
+            # Another session pruned it first
+            continue
+        if expired:
+            shutil.rmtree(path, ignore_errors=True)
+
+def read_faiss_db(path):
+    """Load an index written by save_local, restoring its distance strategy"""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    db = FAISS.load_local(path, get_embeddings(), allow_dangerous_deserialization=True)
+    # save_local doesn't record the distance strategy, so recover it from the index
+    if db.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        db.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+    else:
+        db.distance_strategy = DistanceStrategy.EUCLIDEAN_DISTANCE
+    return db
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def load_faiss_db(pdf_hash, _pages):
+    """Return the FAISS index for a PDF, reusing the on-disk copy when present"""
+    path = faiss_cache_path(pdf_hash)
+    if os.path.isdir(path):
+        try:
+            db = read_faiss_db(path)
+            return db, db.index.ntotal
+        except Exception:
+            # Unreadable entry (damaged, copied in, or from another faiss build): rebuild it
+            shutil.rmtree(path, ignore_errors=True)
+    db, num_chunks = create_faiss_db(_pages)
+    # Write into a scratch folder and move it into place, so an interrupted save
+    # never leaves a half-written entry that passes the isdir check
+    os.makedirs(FAISS_CACHE_DIR, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(prefix=".tmp-", dir=FAISS_CACHE_DIR)
+    db.save_local(tmp_path)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another session saved the same PDF first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return db, num_chunks
+
+def get_faiss_db(pdf_hash, pages):
+    """Look up a PDF's index, refreshing its disk entry even when served from memory"""
+    prune_faiss_cache()
+    db, num_chunks = load_faiss_db(pdf_hash, pages)
+    # Touch the entry only once the index has loaded (or been rebuilt) successfully
+    try:
+        os.utime(faiss_cache_path(pdf_hash))
+    except OSError:
+        pass
+    return db, num_chunks
+
 # ======================================================
 # ---------------  QA CHAIN ----------------------------
 # ======================================================
+def format_docs(docs):
+    return "\n\n".join(doc.page_content for doc in docs)
+
+@st.cache_resource(show_spinner=False)
+def get_llm():
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0, streaming=True, http_client=get_http_client())
+
 def create_qa_chain(db):
-    retriever = db.as_retriever(search_kwargs={"k": 5})
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    from langchain.prompts import PromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.runnables import RunnablePassthrough
+
+    # MMR keeps 3 diverse chunks out of the 20 nearest, so near-duplicate
+    # neighbours don't inflate the prompt
+    retriever = db.as_retriever(search_type="mmr", search_kwargs={"k": 3, "fetch_k": 20, "lambda_mult": 0.5})
+    llm = get_llm()
 
     prompt_template = """
 You are an expert assistant for NIT Uttarakhand students.
@@ -80,512 +239,68 @@ Answer:
 """
     prompt = PromptTemplate(input_variables=["context", "question"], template=prompt_template)
 
-    return RetrievalQA.from_chain_type(
-        llm=llm,
-        retriever=retriever,
-        chain_type="stuff",
-        chain_type_kwargs={"prompt": prompt}
+    # Plain runnable pipeline ("stuff" the retrieved chunks into the prompt) so
+    # the answer can be streamed token by token
+    return (
+        {"context": retriever | format_docs, "question": RunnablePassthrough()}
+        | prompt
+        | llm
+        | StrOutputParser()
     )
 
+# ======================================================
+# ---------------  ANSWER CACHE ------------------------
+# ======================================================
+SEMANTIC_CACHE_THRESHOLD = 0.92
+
+def answer_question(question, on_partial=None):
+    """Answer a question, reusing answers to repeated or paraphrased questions.
+
+    A freshly generated answer is streamed; on_partial receives the text so far.
+    """
+    import numpy as np
+
+    key = hashlib.sha256(question.encode("utf-8")).hexdigest()
+    answer_cache = st.session_state.answer_cache
+    if key in answer_cache:
+        return answer_cache[key]
+
+    q_vec = np.asarray(get_embeddings().embed_query(question), dtype="float32")
+    q_vec /= np.linalg.norm(q_vec)
+    # A single matrix-vector product beats an index for a few hundred questions
+    cached_q_embs = st.session_state.cached_q_embs
+    if cached_q_embs is not None:
+        sims = cached_q_embs @ q_vec
+        best = int(sims.argmax())
+        if sims[best] >= SEMANTIC_CACHE_THRESHOLD:
+            answer_cache[key] = st.session_state.cached_answers[best]
+            return answer_cache[key]
+
+    answer = ""
+    for token in st.session_state.qa_chain.stream(question):
+        answer += token
+        if on_partial:
+            on_partial(answer)
+    answer_cache[key] = answer
+    if cached_q_embs is None:
+        st.session_state.cached_q_embs = q_vec[None, :]
+    else:
+        st.session_state.cached_q_embs = np.vstack([cached_q_embs, q_vec])
+    st.session_state.cached_answers.append(answer)
+    return answer
+
 # ======================================================
 # ---------------  STYLING -----------------------------
 # ======================================================
 st.set_page_config(page_title="NIT UK PDF Assistant", layout="wide", page_icon="🎓")
 
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700;800&display=swap');
-
-* {
-    font-family: 'Poppins', sans-serif;
-}
-
-html, body, [class*="css"] {
-    font-family: 'Poppins', sans-serif;
-}
-
-.main {
-    background: linear-gradient(135deg, #1e3c72 0%, #2a5298 50%, #7e22ce 100%);
-    background-attachment: fixed;
-}
-
-.block-container {
-    background: rgba(255, 255, 255, 0.98);
-    border-radius: 30px;
-    padding: 2.5rem;
-    box-shadow: 0 25px 80px rgba(0,0,0,0.4);
-    backdrop-filter: blur(10px);
-    border: 1px solid rgba(255, 255, 255, 0.3);
-}
-
-/* Sidebar Styling */
-section[data-testid="stSidebar"] {
-    background: linear-gradient(180deg, #1e3c72 0%, #2a5298 50%, #7e22ce 100%) !important;
-}
-
-section[data-testid="stSidebar"] > div {
-    background: linear-gradient(180deg, #1e3c72 0%, #2a5298 50%, #7e22ce 100%) !important;
-    padding: 2rem 1rem;
-}
-
-section[data-testid="stSidebar"] * {
-    color: white !important;
-}
-
-section[data-testid="stSidebar"] .stMarkdown {
-    color: white !important;
-}
-
-section[data-testid="stSidebar"] h1, 
-section[data-testid="stSidebar"] h2, 
-section[data-testid="stSidebar"] h3 {
-    color: white !important;
-    text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-}
-
-section[data-testid="stSidebar"] .stRadio > label {
-    background: rgba(255, 255, 255, 0.15) !important;
-    padding: 1rem;
-    border-radius: 15px;
-    margin: 0.5rem 0;
-    backdrop-filter: blur(5px);
-    transition: all 0.3s ease;
-    border: 2px solid rgba(255, 255, 255, 0.2);
-}
-
-section[data-testid="stSidebar"] .stRadio > label:hover {
-    background: rgba(255, 255, 255, 0.25) !important;
-    transform: translateX(8px);
-    border-color: rgba(255, 255, 255, 0.4);
-    box-shadow: 0 5px 15px rgba(0,0,0,0.2);
-}
-
-section[data-testid="stSidebar"] .stRadio div[role="radiogroup"] > label {
-    color: white !important;
-    font-weight: 600 !important;
-    font-size: 1.05rem !important;
-}
-
-/* Sidebar Info/Success/Warning boxes */
-section[data-testid="stSidebar"] .stAlert {
-    background: rgba(255, 255, 255, 0.2) !important;
-    border-radius: 12px !important;
-    border-left: 4px solid rgba(255, 255, 255, 0.6) !important;
-    backdrop-filter: blur(10px);
-    color: white !important;
-    font-weight: 600 !important;
-}
-
-section[data-testid="stSidebar"] .stAlert div {
-    color: white !important;
-}
-
-/* Logo Container in Sidebar */
-.logo-container {
-    text-align: center;
-    padding: 1.5rem;
-    background: rgba(255, 255, 255, 0.15);
-    border-radius: 20px;
-    margin-bottom: 1.5rem;
-    backdrop-filter: blur(10px);
-    border: 2px solid rgba(255, 255, 255, 0.2);
-    box-shadow: 0 8px 32px rgba(0,0,0,0.2);
-}
-
-.logo-container img {
-    border-radius: 50%;
-    border: 4px solid rgba(255, 255, 255, 0.3);
-    box-shadow: 0 10px 30px rgba(0,0,0,0.3);
-    transition: transform 0.3s ease;
-}
-
-.logo-container img:hover {
-    transform: scale(1.05) rotate(5deg);
-}
-
-.logo-text {
-    color: white !important;
-    font-weight: 700;
-    margin-top: 1rem;
-    font-size: 1.1rem;
-    text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-}
-
-/* Button Styling */
-.stButton>button {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    color: white;
-    border: none;
-    border-radius: 30px;
-    padding: 0.85rem 2.5rem;
-    font-weight: 700;
-    font-size: 1rem;
-    letter-spacing: 0.5px;
-    transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-    box-shadow: 0 8px 25px rgba(102, 126, 234, 0.5);
-    text-transform: uppercase;
-}
-
-.stButton>button:hover {
-    transform: translateY(-4px) scale(1.02);
-    box-shadow: 0 15px 40px rgba(102, 126, 234, 0.7);
-    background: linear-gradient(135deg, #764ba2 0%, #667eea 100%);
-}
-
-.stButton>button:active {
-    transform: translateY(-2px);
-}
-
-/* Chat Bubbles with Glass Effect */
-.chat-bubble-user {
-    background: linear-gradient(135deg, rgba(102, 126, 234, 0.95) 0%, rgba(118, 75, 162, 0.95) 100%);
-    color: white;
-    padding: 1.25rem 1.75rem;
-    border-radius: 25px 25px 8px 25px;
-    margin: 0.75rem 0;
-    margin-left: 15%;
-    animation: slideInRight 0.5s cubic-bezier(0.4, 0, 0.2, 1);
-    box-shadow: 0 10px 30px rgba(102, 126, 234, 0.4);
-    backdrop-filter: blur(10px);
-    border: 1px solid rgba(255, 255, 255, 0.2);
-    font-weight: 500;
-}
-
-.chat-bubble-bot {
-    background: linear-gradient(135deg, rgba(240, 147, 251, 0.95) 0%, rgba(245, 87, 108, 0.95) 100%);
-    color: white;
-    padding: 1.25rem 1.75rem;
-    border-radius: 25px 25px 25px 8px;
-    margin: 0.75rem 0;
-    margin-right: 15%;
-    animation: slideInLeft 0.5s cubic-bezier(0.4, 0, 0.2, 1);
-    box-shadow: 0 10px 30px rgba(245, 87, 108, 0.4);
-    backdrop-filter: blur(10px);
-    border: 1px solid rgba(255, 255, 255, 0.2);
-    font-weight: 500;
-}
-
-@keyframes slideInRight {
-    from {
-        opacity: 0;
-        transform: translateX(80px) scale(0.9);
-    }
-    to {
-        opacity: 1;
-        transform: translateX(0) scale(1);
-    }
-}
+@st.cache_data(show_spinner=False)
+def load_css(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
 
-@keyframes slideInLeft {
-    from {
-        opacity: 0;
-        transform: translateX(-80px) scale(0.9);
-    }
-    to {
-        opacity: 1;
-        transform: translateX(0) scale(1);
-    }
-}
-
-@keyframes float {
-    0%, 100% { transform: translateY(0px); }
-    50% { transform: translateY(-15px); }
-}
-
-@keyframes glow {
-    0%, 100% { box-shadow: 0 0 20px rgba(102, 126, 234, 0.5); }
-    50% { box-shadow: 0 0 40px rgba(102, 126, 234, 0.8); }
-}
-
-/* Stat Cards with Hover Effects */
-.stat-card {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    color: white;
-    padding: 2rem 1.5rem;
-    border-radius: 20px;
-    text-align: center;
-    box-shadow: 0 10px 35px rgba(102, 126, 234, 0.4);
-    transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-    border: 2px solid rgba(255, 255, 255, 0.2);
-    backdrop-filter: blur(10px);
-    position: relative;
-    overflow: hidden;
-}
-
-.stat-card::before {
-    content: '';
-    position: absolute;
-    top: -50%;
-    left: -50%;
-    width: 200%;
-    height: 200%;
-    background: linear-gradient(45deg, transparent, rgba(255,255,255,0.1), transparent);
-    transform: rotate(45deg);
-    transition: all 0.5s ease;
-}
-
-.stat-card:hover::before {
-    left: 100%;
-}
-
-.stat-card:hover {
-    transform: translateY(-10px) scale(1.03);
-    box-shadow: 0 20px 50px rgba(102, 126, 234, 0.6);
-    animation: glow 2s infinite;
-}
-
-.stat-card h2 {
-    font-size: 2.5rem;
-    font-weight: 800;
-    margin: 0.5rem 0;
-    text-shadow: 2px 2px 4px rgba(0,0,0,0.2);
-}
-
-/* Header Title with Animation */
-.header-title {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 50%, #f093fb 100%);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    background-clip: text;
-    font-size: 3.5rem;
-    font-weight: 900;
-    text-align: center;
-    margin-bottom: 0;
-    animation: float 3s ease-in-out infinite;
-    letter-spacing: 1px;
-}
-
-.subtitle {
-    text-align: center;
-    color: #555;
-    font-size: 1.3rem;
-    margin-top: 0.5rem;
-    font-weight: 500;
-    letter-spacing: 0.5px;
-}
-
-/* Input Field Styling */
-.stTextInput>div>div>input {
-    border-radius: 30px;
-    border: 3px solid #667eea;
-    padding: 1rem 2rem;
-    font-size: 1.1rem;
-    transition: all 0.3s ease;
-    background: rgba(255, 255, 255, 0.9);
-    font-weight: 500;
-}
-
-.stTextInput>div>div>input:focus {
-    border-color: #764ba2;
-    box-shadow: 0 0 0 4px rgba(102, 126, 234, 0.3);
-    transform: scale(1.02);
-}
-
-/* Feature Badges */
-.feature-badge {
-    display: inline-block;
-    background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-    color: white;
-    padding: 0.75rem 1.5rem;
-    border-radius: 25px;
-    margin: 0.5rem;
-    font-weight: 700;
-    font-size: 1rem;
-    box-shadow: 0 5px 15px rgba(245, 87, 108, 0.4);
-    transition: all 0.3s ease;
-    border: 2px solid rgba(255, 255, 255, 0.3);
-}
-
-.feature-badge:hover {
-    transform: translateY(-5px) scale(1.05);
-    box-shadow: 0 10px 25px rgba(245, 87, 108, 0.6);
-}
-
-/* Steps Cards */
-.step-card {
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    color: white;
-    padding: 2rem;
-    border-radius: 20px;
-    text-align: center;
-    box-shadow: 0 10px 30px rgba(102, 126, 234, 0.4);
-    transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-    border: 2px solid rgba(255, 255, 255, 0.2);
-    position: relative;
-    overflow: hidden;
-}
-
-.step-card::after {
-    content: '';
-    position: absolute;
-    top: 0;
-    left: 0;
-    width: 100%;
-    height: 100%;
-    background: linear-gradient(45deg, transparent, rgba(255,255,255,0.1));
-    transform: translateX(-100%);
-    transition: transform 0.6s ease;
-}
-
-.step-card:hover::after {
-    transform: translateX(100%);
-}
-
-.step-card:hover {
-    transform: translateY(-10px) rotate(2deg);
-    box-shadow: 0 20px 50px rgba(102, 126, 234, 0.6);
-}
-
-.step-number {
-    font-size: 3rem;
-    font-weight: 900;
-    opacity: 0.9;
-    text-shadow: 3px 3px 6px rgba(0,0,0,0.2);
-}
-
-/* Info boxes */
-.stInfo, .stSuccess, .stWarning {
-    border-radius: 15px;
-    border-left: 5px solid;
-    font-weight: 500;
-}
-
-/* ========= ENHANCED FILE UPLOADER STYLING ========= */
-section[data-testid="stFileUploader"] {
-    background: linear-gradient(135deg, rgba(255, 255, 255, 0.3), rgba(255, 255, 255, 0.2)) !important;
-    border-radius: 25px !important;
-    padding: 2.5rem !important;
-    border: 4px dashed rgba(255, 215, 0, 0.8) !important;
-    backdrop-filter: blur(15px) !important;
-    transition: all 0.4s ease !important;
-    box-shadow: 0 15px 50px rgba(0, 0, 0, 0.4) !important;
-    margin: 1rem 0 !important;
-}
-
-section[data-testid="stFileUploader"]:hover {
-    background: linear-gradient(135deg, rgba(255, 255, 255, 0.4), rgba(255, 255, 255, 0.3)) !important;
-    border-color: rgba(255, 215, 0, 1) !important;
-    transform: scale(1.03) !important;
-    box-shadow: 0 20px 60px rgba(255, 215, 0, 0.3) !important;
-}
-
-section[data-testid="stFileUploader"] label {
-    color: #FFD700 !important;
-    font-weight: 900 !important;
-    font-size: 1.3rem !important;
-    text-shadow: 3px 3px 8px rgba(0,0,0,0.6) !important;
-    margin-bottom: 1.5rem !important;
-    display: block !important;
-    letter-spacing: 1px !important;
-}
-
-section[data-testid="stFileUploader"] small {
-    color: rgba(255, 255, 255, 1) !important;
-    font-weight: 700 !important;
-    text-shadow: 2px 2px 5px rgba(0,0,0,0.5) !important;
-    font-size: 1rem !important;
-    background: rgba(0, 0, 0, 0.3) !important;
-    padding: 0.3rem 0.8rem !important;
-    border-radius: 10px !important;
-    display: inline-block !important;
-}
-
-/* File uploader drag and drop area */
-section[data-testid="stFileUploader"] > div > div {
-    background: linear-gradient(135deg, rgba(255, 255, 255, 0.25), rgba(255, 255, 255, 0.15)) !important;
-    border: 4px dashed rgba(255, 255, 255, 0.8) !important;
-    border-radius: 20px !important;
-    padding: 3.5rem 2rem !important;
-    min-height: 200px !important;
-    display: flex !important;
-    align-items: center !important;
-    justify-content: center !important;
-    transition: all 0.3s ease !important;
-}
-
-section[data-testid="stFileUploader"] > div > div:hover {
-    background: linear-gradient(135deg, rgba(255, 255, 255, 0.35), rgba(255, 255, 255, 0.25)) !important;
-    border-color: rgba(255, 255, 255, 1) !important;
-    border-width: 5px !important;
-}
-
-/* Browse files button - SUPER VISIBLE */
-section[data-testid="stFileUploader"] button {
-    background: linear-gradient(135deg, #FF6B6B 0%, #FF8E53 50%, #FFD93D 100%) !important;
-    color: #1a1a2e !important;
-    border: 3px solid rgba(255, 255, 255, 0.9) !important;
-    border-radius: 25px !important;
-    padding: 1.2rem 3rem !important;
-    font-weight: 900 !important;
-    font-size: 1.2rem !important;
-    box-shadow: 0 10px 40px rgba(255, 107, 107, 0.6) !important;
-    transition: all 0.4s ease !important;
-    text-transform: uppercase !important;
-    letter-spacing: 2px !important;
-    text-shadow: 1px 1px 2px rgba(255, 255, 255, 0.5) !important;
-}
-
-section[data-testid="stFileUploader"] button:hover {
-    transform: translateY(-8px) scale(1.08) !important;
-    box-shadow: 0 15px 50px rgba(255, 107, 107, 0.8) !important;
-    background: linear-gradient(135deg, #FFD93D 0%, #FF8E53 50%, #FF6B6B 100%) !important;
-    border-color: rgba(255, 255, 255, 1) !important;
-}
-
-/* File upload text and icons */
-section[data-testid="stFileUploader"] [data-testid="stMarkdownContainer"] p {
-    color: rgba(255, 255, 255, 1) !important;
-    font-weight: 700 !important;
-    font-size: 1.1rem !important;
-    text-shadow: 2px 2px 5px rgba(0,0,0,0.5) !important;
-    background: rgba(0, 0, 0, 0.2) !important;
-    padding: 0.5rem 1rem !important;
-    border-radius: 10px !important;
-    display: inline-block !important;
-}
-
-/* Drag and drop text */
-section[data-testid="stFileUploader"] span {
-    color: rgba(255, 255, 255, 1) !important;
-    font-weight: 700 !important;
-    text-shadow: 2px 2px 5px rgba(0,0,0,0.5) !important;
-}
-
-/* Uploaded file display */
-section[data-testid="stFileUploader"] [data-testid="stFileUploaderFile"] {
-    background: linear-gradient(135deg, rgba(255, 215, 0, 0.3), rgba(255, 255, 255, 0.3)) !important;
-    border-radius: 15px !important;
-    padding: 1.2rem !important;
-    border: 3px solid rgba(255, 215, 0, 0.6) !important;
-    backdrop-filter: blur(10px) !important;
-    box-shadow: 0 5px 20px rgba(255, 215, 0, 0.3) !important;
-}
-
-section[data-testid="stFileUploader"] [data-testid="stFileUploaderFile"] button {
-    background: linear-gradient(135deg, #FF6B6B, #FF8E53) !important;
-    border-radius: 12px !important;
-    padding: 0.6rem 1.2rem !important;
-    border: 2px solid white !important;
-}
-
-/* File name text */
-section[data-testid="stFileUploader"] [data-testid="stFileUploaderFileName"] {
-    color: white !important;
-    font-weight: 700 !important;
-    text-shadow: 2px 2px 4px rgba(0,0,0,0.5) !important;
-    font-size: 1.05rem !important;
-}
-
-/* Divider */
-hr {
-    border: none;
-    height: 2px;
-    background: linear-gradient(90deg, transparent, rgba(102, 126, 234, 0.5), transparent);
-    margin: 2rem 0;
-}
-
-</style>
-""", unsafe_allow_html=True)
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "app.css")
+st.markdown(f"<style>{load_css(CSS_PATH)}</style>", unsafe_allow_html=True)
 
 # ======================================================
 # --------------- SIDEBAR ------------------------------
@@ -699,30 +414,48 @@ if not uploaded_file:
     st.stop()
 
 # Process PDF
-if "processed" not in st.session_state:
+# Reruns with the same upload skip reading the bytes; a new upload is hashed
+# and only reprocessed when its content differs from the current PDF
+if st.session_state.get("file_id") != uploaded_file.file_id:
+    pdf_bytes = uploaded_file.getvalue()
+    pdf_hash = xxhash.xxh3_64(pdf_bytes).hexdigest()
+else:
+    pdf_hash = st.session_state.pdf_hash
+
+if st.session_state.get("pdf_hash") != pdf_hash:
     with st.spinner("🔄 Processing your PDF with AI... Please wait"):
-        uploaded_file.seek(0)
-        text = extract_text(uploaded_file)
-        uploaded_file.seek(0)
-        pdf_info = get_pdf_info(uploaded_file)
-        uploaded_file.seek(0)
-        db, num_chunks = create_faiss_db(text)
+        pages, pdf_info = extract_text_and_info(pdf_hash, pdf_bytes)
+        text = "".join(pages)
+        # Count words once here; split() in the Analytics view would build a list of every word
+        word_count = sum(1 for _ in _WORD_RE.finditer(text))
+        db, num_chunks = get_faiss_db(pdf_hash, pages)
         qa_chain = create_qa_chain(db)
-        pdf_bytes = uploaded_file.getvalue()
         
-        st.session_state.processed = True
+        st.session_state.pdf_hash = pdf_hash
         st.session_state.text = text
         st.session_state.db = db
         st.session_state.qa_chain = qa_chain
         st.session_state.pdf_bytes = pdf_bytes
         st.session_state.pdf_info = pdf_info
         st.session_state.num_chunks = num_chunks
+        st.session_state.word_count = word_count
+        st.session_state.answer_cache = {}
+        st.session_state.cached_q_embs = None
+        st.session_state.cached_answers = []
         st.balloons()
         st.success("✅ PDF processed successfully! Start asking questions.")
+st.session_state.file_id = uploaded_file.file_id
+
+def user_bubble(msg, timestamp):
+    return f"<div class='chat-bubble-user'><b>👤 You</b> <small style='opacity: 0.8;'>• {timestamp}</small><br><br>{msg}</div>"
+
+def bot_bubble(msg, timestamp):
+    return f"<div class='chat-bubble-bot'><b>🤖 AI Assistant</b> <small style='opacity: 0.8;'>• {timestamp}</small><br><br>{msg}</div>"
 
 # Session state for chat
 if "chat" not in st.session_state:
     st.session_state.chat = []
+    st.session_state.chat_html = []
 
 # ======================================================
 # --------------- MENU HANDLING ------------------------
@@ -755,26 +488,33 @@ if menu == "💬 Chat":
     
     st.markdown("---")
     
-    question = st.text_input("✍️ Type your question here:", value=selected_quick if selected_quick else "", key="question_input", placeholder="Ask me anything about your PDF...")
+    # chat_input only reruns on submit and returns the question once, so an
+    # answered question is not asked again on the next rerun
+    question = st.chat_input("Ask me anything about your PDF...") or selected_quick
     
-    if question:
-        with st.spinner("🤔 AI is thinking..."):
-            result = st.session_state.qa_chain.invoke({"query": question})
-            answer = result["result"]
-            timestamp = datetime.now().strftime("%H:%M")
-            st.session_state.chat.append(("user", question, timestamp))
-            st.session_state.chat.append(("bot", answer, timestamp))
-
-    # Chat display with timestamps
-    if st.session_state.chat:
+    # Chat display with timestamps, sent as one pre-rendered block per rerun
+    if st.session_state.chat or question:
         st.markdown("### 💭 Conversation Thread")
-        for sender, msg, timestamp in st.session_state.chat:
-            if sender == "user":
-                st.markdown(f"<div class='chat-bubble-user'><b>👤 You</b> <small style='opacity: 0.8;'>• {timestamp}</small><br><br>{msg}</div>", unsafe_allow_html=True)
-            else:
-                st.markdown(f"<div class='chat-bubble-bot'><b>🤖 AI Assistant</b> <small style='opacity: 0.8;'>• {timestamp}</small><br><br>{msg}</div>", unsafe_allow_html=True)
+        if st.session_state.chat_html:
+            st.markdown("".join(st.session_state.chat_html), unsafe_allow_html=True)
     else:
-        st.info("👋 Start the conversation by asking a question above!")
+        st.info("👋 Start the conversation by asking a question below!")
+
+    # The new turn streams in below the existing thread
+    if question:
+        timestamp = datetime.now().strftime("%H:%M")
+        st.markdown(user_bubble(question, timestamp), unsafe_allow_html=True)
+        placeholder = st.empty()
+        with st.spinner("🤔 AI is thinking..."):
+            answer = answer_question(
+                question,
+                on_partial=lambda partial: placeholder.markdown(bot_bubble(partial, timestamp), unsafe_allow_html=True),
+            )
+        # Cached answers skip on_partial, so always draw the final bubble
+        placeholder.markdown(bot_bubble(answer, timestamp), unsafe_allow_html=True)
+        st.session_state.chat.append(("user", question, timestamp))
+        st.session_state.chat.append(("bot", answer, timestamp))
+        st.session_state.chat_html.append(user_bubble(question, timestamp) + bot_bubble(answer, timestamp))
 
 # ANALYTICS MODE
 elif menu == "📊 Analytics":
@@ -807,10 +547,9 @@ elif menu == "📊 Analytics":
         """, unsafe_allow_html=True)
     
     with col4:
-        word_count = len(st.session_state.text.split())
         st.markdown(f"""
         <div class='stat-card'>
-            <h2>{word_count:,}</h2>
+            <h2>{st.session_state.word_count:,}</h2>
             <p style='font-size: 1.1rem; font-weight: 600;'>📝 Words</p>
         </div>
         """, unsafe_allow_html=True)